@@ -1,11 +1,17 @@
 """
 Asclepius API Interface
 -----------------------
-To Run: uvicorn app:app --reload
+To Run (dev):        uvicorn app:app --reload
+To Run (production): gunicorn app:app -k uvicorn.workers.UvicornWorker -w $(nproc) --preload
+                     (--preload loads the spaCy model once before forking workers;
+                      uvicorn picks uvloop + httptools automatically when installed)
 """
+import asyncio
+from typing import Any, Dict, List
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ConfigDict, Field
 from main import HealthAIGateway
 from dotenv import load_dotenv
 import logging
@@ -19,6 +25,17 @@ logger = logging.getLogger("AsclepiusAPI")
 
 gateway = None
 
+# SECURITY: Upper bound on a single transaction's JSON body. Field limits are
+# in characters, and ASCII-escaped JSON (the stdlib/`requests` default) spends
+# up to 12 bytes per character: an astral character is a `\uXXXX\uXXXX`
+# surrogate pair but counts once towards max_length. Add JSON overhead on top.
+MAX_TRANSACTION_BYTES = 12 * (1000 + 10000 + 5000) + 1024
+MAX_BATCH_SIZE = 32
+MAX_BODY_BYTES = {
+    "/evaluate": MAX_TRANSACTION_BYTES,
+    "/evaluate_batch": MAX_BATCH_SIZE * MAX_TRANSACTION_BYTES,
+}
+
 # MODERN PATTERN: Lifespan Context Manager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -26,6 +43,8 @@ async def lifespan(app: FastAPI):
     global gateway
     try:
         logger.info("Booting Asclepius Gateway...")
+        loop = asyncio.get_running_loop()
+        logger.info(f"Event loop: {type(loop).__module__}.{type(loop).__name__}")
         gateway = HealthAIGateway()
         yield
     except Exception as e:
@@ -35,26 +54,88 @@ async def lifespan(app: FastAPI):
     finally:
         # Shutdown logic (cleanup)
         logger.info("Shutting down Gateway...")
+        if gateway:
+            await gateway.aclose()
 
+# PERFORMANCE: Endpoints declare return types so FastAPI serializes responses
+# straight to JSON bytes with pydantic-core
 app = FastAPI(title="Asclepius: Clinical Guardrails API", lifespan=lifespan)
 
+class BodySizeLimitMiddleware:
+    """
+    PERFORMANCE/SECURITY: Bounds request bodies before Pydantic sees them.
+    A declared Content-Length is rejected up front; bodies without one
+    (Transfer-Encoding: chunked) are counted as they stream in and cut off
+    with a 413 as soon as they pass the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = MAX_BODY_BYTES.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None:
+            if not content_length.isdigit():
+                response = JSONResponse(status_code=400, content={"detail": "Invalid Content-Length"})
+                return await response(scope, receive, send)
+            if int(content_length) > limit:
+                response = JSONResponse(status_code=413, content={"detail": "Request body too large"})
+                return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Surfaces as a 413 through FastAPI's exception handling
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(BodySizeLimitMiddleware)
+
 class EvaluationRequest(BaseModel):
+    # PERFORMANCE: Strict mode skips type coercion in pydantic-core
+    model_config = ConfigDict(strict=True, str_max_length=10000)
+
     # SECURITY: Add limits to prevent DOS attacks
     query: str = Field(..., max_length=1000)
     context: str = Field(..., max_length=10000)
     response: str = Field(..., max_length=5000)
 
 @app.post("/evaluate")
-async def evaluate_health_ai(request: EvaluationRequest):
+async def evaluate_health_ai(request: EvaluationRequest) -> Dict[str, Any]:
     if not gateway:
         raise HTTPException(status_code=503, detail="Gateway not initialized")
     
-    return gateway.process_transaction(
+    return await gateway.process_transaction(
         request.query, 
         request.context, 
         request.response
     )
 
+class BatchEvaluationRequest(BaseModel):
+    # SECURITY: Bound the batch size as well as each field
+    transactions: List[EvaluationRequest] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+@app.post("/evaluate_batch")
+async def evaluate_health_ai_batch(request: BatchEvaluationRequest) -> List[Dict[str, Any]]:
+    if not gateway:
+        raise HTTPException(status_code=503, detail="Gateway not initialized")
+    
+    return await gateway.process_batch([
+        (item.query, item.context, item.response)
+        for item in request.transactions
+    ])
+
 @app.get("/health")
-async def health_check():
+async def health_check() -> Dict[str, str]:
     return {"status": "operational", "version": "1.0.0"}
\ No newline at end of file
@@ -6,8 +6,15 @@ against provided medical context, ensuring citation accuracy and safety.
 """
 
 import os
-import json
-from typing import Dict
+import re
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import httpx
+import orjson
+from rapidfuzz import fuzz
 from dotenv import load_dotenv
 
 # NEW SDK IMPORT: Migrated from 'google.generativeai' to 'google-genai'
@@ -17,20 +24,168 @@ from google.genai import types
 # Load env vars if running standalone (e.g. for testing)
 load_dotenv()
 
+# Local fast-path knobs (see ClinicalEvaluator._is_trivially_grounded).
+# The default of 1.0 only admits verbatim excerpts of the context; set
+# FAST_PASS_THRESHOLD above 1 to always use the LLM judge.
+FAST_PASS_THRESHOLD = float(os.getenv("FAST_PASS_THRESHOLD", "1.0"))
+FAST_PASS_MAX_LENGTH = int(os.getenv("FAST_PASS_MAX_LENGTH", "500"))
+
+# Tokens whose presence flips or quantifies a clinical claim. A fast-path
+# response may only use ones that also appear in the context.
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+_NEGATION_RE = re.compile(
+    r"\b(?:no|not|never|none|nor|neither|without|avoid|cannot|can't|don't|doesn't|"
+    r"isn't|aren't|shouldn't|mustn't|won't|contraindicated)\b",
+    re.I
+)
+
+# Labels for the dynamic (per-transaction) part of the prompt
+_QUERY_LABEL = "User Query: "
+_CONTEXT_LABEL = "\nSource Context: "
+_RESPONSE_LABEL = "\nActual Response: "
+
+# Slices the outermost JSON object/array, tolerating stray fences or prose
+_JSON_RE = re.compile(rb"[\[{].*[\]}]", re.S)
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised when the evaluator is failing fast after repeated upstream errors.
+    """
+
+
+class CircuitBreaker:
+    """
+    Minimal circuit breaker for the Gemini call path.
+    Opens after `fail_max` consecutive failures and rejects calls until
+    `reset_timeout` seconds pass. Then exactly one probe call is admitted
+    (all others keep failing fast); its success closes the circuit and its
+    failure re-opens it.
+    """
+
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 30.0):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        """
+        True while calls should fail fast (including while a probe is in flight).
+        """
+        if self._opened_at is None:
+            return False
+        return self._probing or time.monotonic() - self._opened_at < self.reset_timeout
+
+    def allow_request(self) -> bool:
+        """
+        Admits a call, claiming the single half-open probe slot if needed.
+        """
+        if self.is_open:
+            return False
+        if self._opened_at is not None:
+            self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probing = False
+        if self._failures >= self.fail_max:
+            self._opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        """
+        Frees the probe slot without a verdict (e.g. the call was cancelled).
+        """
+        self._probing = False
+
+
 class ClinicalEvaluator:
-    def __init__(self, model_name: str = 'gemini-2.5-flash-lite'):
+    def __init__(
+        self,
+        model_name: str = 'gemini-2.5-flash-lite',
+        cache_size: int = 10_000,
+        max_batch_size: int = 8,
+        max_batch_wait: float = 0.05,
+        fast_pass_threshold: float = FAST_PASS_THRESHOLD,
+        fast_pass_max_length: int = FAST_PASS_MAX_LENGTH,
+        breaker_fail_max: int = 5,
+        breaker_reset_timeout: float = 30.0,
+        evaluation_timeout: float = 60.0
+    ):
         """
         Initializes the evaluator using the modern Google Gen AI SDK.
+        Repeated evaluations are served from a bounded in-memory LRU cache;
+        concurrent ones are micro-batched into a single Gemini call.
+
+        Short responses found in the context with similarity of at least
+        fast_pass_threshold (0-1) are passed locally without an API call.
+        Set fast_pass_threshold above 1 to always use the LLM judge.
+
+        Identical in-flight evaluations share one Gemini call, and a circuit
+        breaker fails fast during provider outages. No caller waits longer
+        than evaluation_timeout seconds for a verdict.
         """
         api_key = os.getenv('GOOGLE_API_KEY')
         if not api_key:
             raise ValueError("GOOGLE_API_KEY environment variable not set.")
             
+        # PERFORMANCE: One pooled HTTP client shared by every request, so
+        # TLS/TCP handshakes are paid once instead of per evaluation.
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            http2=True,
+            timeout=30,
+        )
+
         # Initialize Client with the new SDK syntax
-        self.client = genai.Client(api_key=api_key)
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(httpx_async_client=self._http)
+        )
         self.model_name = model_name
         self.safety_rubric = self._load_safety_rubric()
 
+        # PERFORMANCE: The rubric is sent as a fixed system instruction so the
+        # shared prefix is eligible for Gemini's implicit prompt caching; each
+        # request only contributes the short dynamic transaction text.
+        self._generation_config = types.GenerateContentConfig(
+            system_instruction=self.safety_rubric,
+            response_mime_type="application/json"
+        )
+
+        # PERFORMANCE: Exact-match verdict cache (LRU-bounded). Keys are seeded
+        # with the model name and rubric text, so changing either invalidates
+        # every entry automatically.
+        self.cache_size = cache_size
+        self._cache_seed = hashlib.blake2b(digest_size=16)
+        for part in (self.model_name, self.safety_rubric):
+            self._update_digest(self._cache_seed, part)
+        self._cache: "OrderedDict[bytes, Dict]" = OrderedDict()
+
+        # PERFORMANCE: Local fast-path for trivially grounded responses
+        self.fast_pass_threshold = fast_pass_threshold
+        self.fast_pass_max_length = fast_pass_max_length
+
+        # PERFORMANCE: Micro-batching. Requests arriving within max_batch_wait
+        # seconds of each other share one prompt (up to max_batch_size).
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait
+        self._queue: "asyncio.Queue[Tuple[Tuple[str, str, str], bytes, asyncio.Future]]" = asyncio.Queue()
+        self._batch_worker: Optional[asyncio.Task] = None
+        self._dispatches: set = set()
+
+        # RELIABILITY: Request coalescing + fail-fast on provider incidents
+        self._inflight: Dict[bytes, asyncio.Future] = {}
+        self._breaker = CircuitBreaker(fail_max=breaker_fail_max, reset_timeout=breaker_reset_timeout)
+        self.evaluation_timeout = evaluation_timeout
+
     def _load_safety_rubric(self) -> str:
         """
         Defines the prompt engineering logic for the 'AI Judge'.
@@ -52,7 +207,18 @@ class ClinicalEvaluator:
         }
         """
 
-    def evaluate_transaction(self, query: str, context: str, response: str) -> Dict:
+    async def aclose(self) -> None:
+        """
+        Stops the batch worker and releases the pooled HTTP connections.
+        Call once on shutdown.
+        """
+        if self._batch_worker:
+            self._batch_worker.cancel()
+            await asyncio.gather(self._batch_worker, return_exceptions=True)
+            self._batch_worker = None
+        await self._http.aclose()
+
+    async def evaluate_transaction(self, query: str, context: str, response: str) -> Dict:
         """
         Runs the evaluation for a single QA pair.
         
@@ -64,34 +230,252 @@ class ClinicalEvaluator:
         Returns:
             JSON dict containing the evaluation results.
         """
-        prompt = f"""
-        {self.safety_rubric}
+        if self._is_trivially_grounded(context, response):
+            # Only grounding is established locally; omissions are NOT checked
+            return {
+                "score": 9,
+                "hallucination_detected": False,
+                "fast_path": True,
+                "reasoning": "Response closely mirrors the source context (local fast-path; "
+                             "LLM audit skipped, missing warnings not evaluated)."
+            }
+
+        cache_key = self._cache_key(query, context, response)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
 
-        ---
-        User Query: {query}
-        Source Context: {context}
-        Actual Response: {response}
-        ---
-        """
-        
         try:
-            # NEW SDK SYNTAX: 
-            # 1. Use client.models.generate_content
-            # 2. Use 'config' to enforce JSON response type (Native JSON Mode)
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json"
-                )
-            )
-            
-            # The API now guarantees valid JSON if the model supports it (Gemini 1.5 does)
-            return json.loads(response.text)
-            
+            future = self._inflight.get(cache_key)
+            if future is None:
+                if self._breaker.is_open:
+                    raise CircuitOpenError("Evaluation service unavailable; circuit open.")
+
+                if self._batch_worker is None or self._batch_worker.done():
+                    self._batch_worker = asyncio.create_task(self._batch_loop())
+
+                future = asyncio.get_running_loop().create_future()
+                self._inflight[cache_key] = future
+                future.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+                await self._queue.put(((query, context, response), cache_key, future))
+
+            # Shield so one cancelled (or timed-out) caller does not cancel the shared call
+            return dict(await asyncio.wait_for(asyncio.shield(future), self.evaluation_timeout))
+        except asyncio.TimeoutError:
+            return {
+                "error": "Evaluation timed out.",
+                "score": 0,
+                "reasoning": "Evaluation pipeline failed."
+            }
         except Exception as e:
             return {
                 "error": str(e),
                 "score": 0,
                 "reasoning": "Evaluation pipeline failed."
-            }
\ No newline at end of file
+            }
+
+    def _is_trivially_grounded(self, context: str, response: str) -> bool:
+        """
+        Cheap local check: a short response that is an (effectively) verbatim
+        excerpt of the context cannot hallucinate beyond it.
+        """
+        if not response or len(response) >= self.fast_pass_max_length:
+            return False
+        # partial_ratio aligns the shorter string inside the longer one, so the
+        # response must be the shorter side for "response found in context"
+        if len(response) > len(context):
+            return False
+        # Any number or negation the context lacks is a new claim
+        if not set(_NUMBER_RE.findall(response)) <= set(_NUMBER_RE.findall(context)):
+            return False
+        if not {t.lower() for t in _NEGATION_RE.findall(response)} <= {t.lower() for t in _NEGATION_RE.findall(context)}:
+            return False
+        # partial_ratio (C-implemented) approximates ROUGE-L on a 0-100 scale
+        alignment = fuzz.partial_ratio_alignment(response, context)
+        if alignment is None or alignment.score < self.fast_pass_threshold * 100:
+            return False
+        # An excerpt that drops a preceding negation ("[Not] safe ...") inverts it
+        preceding = context[:alignment.dest_start].split()[-3:]
+        return not _NEGATION_RE.search(" ".join(preceding))
+
+    async def _batch_loop(self) -> None:
+        """
+        Background worker: drains the queue into batches and dispatches each
+        batch without waiting for the previous one to finish.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_batch_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Keep a reference so in-flight dispatches are not garbage collected
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Tuple[str, str, str], bytes, asyncio.Future]]) -> None:
+        """
+        Evaluates a batch and resolves each waiting caller's Future.
+        Falls back to one call per item for any verdict that cannot be routed.
+        """
+        transactions = [item[0] for item in batch]
+        failure: Optional[BaseException] = None
+        try:
+            if len(batch) == 1:
+                results = [await self._evaluate_single(*transactions[0])]
+            else:
+                try:
+                    results = await self._evaluate_batch(transactions)
+                except (ValueError, TypeError):
+                    results = [None] * len(transactions)
+
+                # Re-evaluate individually any transaction without a routed verdict
+                missing = [i for i, result in enumerate(results) if result is None]
+                if missing:
+                    retried = await asyncio.gather(
+                        *(self._evaluate_single(*transactions[i]) for i in missing),
+                        return_exceptions=True
+                    )
+                    for i, result in zip(missing, retried):
+                        results[i] = result
+
+            for (_, cache_key, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    self._cache_put(cache_key, result)
+                    future.set_result(result)
+        except Exception as e:
+            failure = e
+        finally:
+            # Never leave a caller waiting on an unsettled Future
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(failure or RuntimeError("Evaluation batch was not resolved."))
+
+    async def _generate_json(self, prompt: str):
+        """
+        Sends a prompt to Gemini in native JSON mode and parses the reply.
+        """
+        if not self._breaker.allow_request():
+            raise CircuitOpenError("Evaluation service unavailable; circuit open.")
+
+        # NEW SDK SYNTAX:
+        # 1. Use client.aio.models.generate_content (non-blocking)
+        # 2. Use 'config' to enforce JSON response type (Native JSON Mode)
+        #    and carry the rubric as the system instruction
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=prompt,
+                config=self._generation_config
+            )
+        except asyncio.CancelledError:
+            self._breaker.release_probe()
+            raise
+        except Exception:
+            self._breaker.record_failure()
+            raise
+        self._breaker.record_success()
+
+        # The API now guarantees valid JSON if the model supports it (Gemini 1.5 does)
+        # PERFORMANCE: orjson parses bytes directly, ~3x faster than stdlib json
+        # Safety-blocked or empty candidates have no text; treat as a bad
+        # verdict so a batch falls back to per-item calls
+        if response.text is None:
+            raise ValueError("Evaluation returned no text (blocked or empty candidate).")
+        raw = response.text.encode()
+        match = _JSON_RE.search(raw)
+        return orjson.loads(match.group(0) if match else raw)
+
+    def _transaction_parts(self, query: str, context: str, response: str) -> List[str]:
+        return [
+            _QUERY_LABEL, query,
+            _CONTEXT_LABEL, context,
+            _RESPONSE_LABEL, response, "\n"
+        ]
+
+    async def _evaluate_single(self, query: str, context: str, response: str) -> Dict:
+        prompt = "".join(self._transaction_parts(query, context, response))
+        result = await self._generate_json(prompt)
+        if not isinstance(result, dict):
+            raise ValueError("Evaluation returned a non-object verdict.")
+        return result
+
+    async def _evaluate_batch(self, transactions: List[Tuple[str, str, str]]) -> List[Optional[Dict]]:
+        """
+        Evaluates several transactions in one call. Verdicts are routed back by
+        their "transaction" number, never by array position; slots with a
+        missing, duplicated or malformed verdict are returned as None.
+        """
+        parts = [
+            f"Evaluate each of the following {len(transactions)} transactions independently.\n"
+            f"Return ONLY a JSON array of {len(transactions)} objects in the format from your instructions,\n"
+            "one per transaction, each with an added integer \"transaction\" field set to its transaction number.\n"
+        ]
+        for i, transaction in enumerate(transactions, start=1):
+            parts.append(f"--- Transaction {i} ---\n")
+            parts.extend(self._transaction_parts(*transaction))
+        prompt = "".join(parts)
+        verdicts = await self._generate_json(prompt)
+        if not isinstance(verdicts, list):
+            raise ValueError("Batched evaluation did not return a verdict array.")
+
+        results: List[Optional[Dict]] = [None] * len(transactions)
+        duplicated = set()
+        for verdict in verdicts:
+            if not isinstance(verdict, dict):
+                continue
+            number = verdict.pop("transaction", None)
+            if type(number) is not int or not 1 <= number <= len(transactions):
+                continue
+            if results[number - 1] is not None:
+                duplicated.add(number - 1)
+            results[number - 1] = verdict
+        for slot in duplicated:
+            results[slot] = None
+        return results
+
+    def _cache_key(self, query: str, context: str, response: str) -> bytes:
+        """
+        Hashes the rubric-seeded digest and the sanitized triple into a compact key.
+        """
+        digest = self._cache_seed.copy()
+        for part in (query, context, response):
+            self._update_digest(digest, part)
+        return digest.digest()
+
+    @staticmethod
+    def _update_digest(digest, part: str) -> None:
+        # Length-prefix each part so field boundaries cannot collide
+        encoded = part.encode("utf-8")
+        digest.update(len(encoded).to_bytes(8, "little"))
+        digest.update(encoded)
+
+    def _cache_get(self, key: bytes) -> Optional[Dict]:
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+            # Hand out a copy so callers cannot mutate the cached verdict
+            return dict(result)
+        return None
+
+    def _cache_put(self, key: bytes, result: Dict) -> None:
+        # Only successful verdicts are cached; errors must be retried
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = dict(result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -5,8 +5,10 @@ Purpose: Coordinates the workflow between the Local PII Scrubber and the
 Cloud-based Clinical Evaluator. Enforces the security boundary.
 """
 
+import asyncio
 import logging
 import json
+from typing import List, Set, Tuple
 from scrubber import LocalPIIScrubber
 from evaluator import ClinicalEvaluator
 
@@ -33,7 +35,13 @@ class HealthAIGateway:
             logger.critical(f"System Startup Failed: {e}")
             raise RuntimeError("Could not initialize Health AI Gateway.")
 
-    def process_transaction(self, raw_query: str, raw_context: str, raw_response: str) -> dict:
+    async def aclose(self) -> None:
+        """
+        Releases network resources held by the pipeline components.
+        """
+        await self.intelligence_layer.aclose()
+
+    async def process_transaction(self, raw_query: str, raw_context: str, raw_response: str) -> dict:
         """
         Executes the Secure Evaluation Pipeline.
         Process Flow: Receive Data -> Scrub PII -> Send to Cloud -> Return Score
@@ -42,14 +50,39 @@ class HealthAIGateway:
         # --- Step 1: Security Audit (Local Execution) ---
         logger.info("Step 1: Scrubbing sensitive data locally...")
         
-        safe_query, query_pii = self.security_layer.scrub_text(raw_query)
-        safe_context, context_pii = self.security_layer.scrub_text(raw_context)
-        safe_response, response_pii = self.security_layer.scrub_text(raw_response)
+        # PERFORMANCE: Scrub all three fields in one batched pass, off the event loop
+        scrubbed = await asyncio.to_thread(
+            self.security_layer.scrub_texts, [raw_query, raw_context, raw_response]
+        )
+        
+        return await self._evaluate_scrubbed(scrubbed)
+
+    async def process_batch(self, transactions: List[Tuple[str, str, str]]) -> List[dict]:
+        """
+        Executes the Secure Evaluation Pipeline for many transactions at once.
+        All fields are scrubbed in one spaCy batch; evaluations run concurrently.
+        """
+        
+        # --- Step 1: Security Audit (Local Execution) ---
+        logger.info(f"Step 1: Scrubbing {len(transactions)} transactions locally...")
+        
+        flat = [text for transaction in transactions for text in transaction]
+        scrubbed = await asyncio.to_thread(self.security_layer.scrub_batch, flat)
+        
+        return await asyncio.gather(*(
+            self._evaluate_scrubbed(scrubbed[i:i + 3]) for i in range(0, len(scrubbed), 3)
+        ))
+
+    async def _evaluate_scrubbed(self, scrubbed: List[Tuple[str, Set[str]]]) -> dict:
+        """
+        Runs Steps 2-3 on an already scrubbed (query, context, response) triple.
+        """
+        (safe_query, query_pii), (safe_context, context_pii), (safe_response, response_pii) = scrubbed
         
-        total_pii_detected = len(query_pii) + len(context_pii) + len(response_pii)
+        all_pii = query_pii | context_pii | response_pii
         
-        if total_pii_detected > 0:
-            logger.warning(f"PII Detected and Redacted. Count: {total_pii_detected}")
+        if all_pii:
+            logger.warning(f"PII Detected and Redacted. Types: {len(all_pii)}")
         else:
             logger.info("No PII detected in transaction.")
 
@@ -57,7 +90,7 @@ class HealthAIGateway:
         logger.info("Step 2: Sending sanitized data to Gemini for evaluation...")
         
         try:
-            evaluation_result = self.intelligence_layer.evaluate_transaction(
+            evaluation_result = await self.intelligence_layer.evaluate_transaction(
                 query=safe_query,
                 context=safe_context,
                 response=safe_response
@@ -72,8 +105,8 @@ class HealthAIGateway:
         final_report = {
             "status": "success",
             "security_audit": {
-                "pii_detected": bool(total_pii_detected > 0),
-                "redacted_entity_types": list(set(query_pii + context_pii + response_pii))
+                "pii_detected": bool(all_pii),
+                "redacted_entity_types": list(all_pii)
             },
             "clinical_quality": evaluation_result
         }
@@ -0,0 +1,45 @@
+"""
+Tests for the request body size limits in the API layer.
+"""
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+import app as api
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client():
+    # No lifespan: the gateway stays uninitialized, so bodies that pass the
+    # size checks end in a 503 instead of reaching the pipeline
+    return TestClient(api.app)
+
+
+def chunked(payload: bytes, chunk_size: int = 4096):
+    for start in range(0, len(payload), chunk_size):
+        yield payload[start:start + chunk_size]
+
+
+def test_declared_oversized_body_is_rejected(client):
+    body = b"x" * (api.MAX_TRANSACTION_BYTES + 1)
+    response = client.post("/evaluate", content=body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 413
+
+
+def test_chunked_oversized_body_is_rejected(client):
+    body = b'{"query": "' + b"x" * (api.MAX_TRANSACTION_BYTES + 1) + b'"}'
+    response = client.post(
+        "/evaluate", content=chunked(body), headers={"Content-Type": "application/json"}
+    )
+    assert "content-length" not in response.request.headers
+    assert response.status_code == 413
+
+
+def test_chunked_body_within_limit_is_accepted(client):
+    body = b'{"query": "q", "context": "c", "response": "r"}'
+    response = client.post(
+        "/evaluate", content=chunked(body, 8), headers={"Content-Type": "application/json"}
+    )
+    assert response.status_code == 503
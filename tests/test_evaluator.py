@@ -0,0 +1,208 @@
+"""
+Tests for the local logic in ClinicalEvaluator (no network calls).
+"""
+
+import asyncio
+import re
+import time
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+pytest.importorskip("google.genai")
+
+import evaluator
+
+
+@pytest.fixture
+def clinical_evaluator(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    instance = evaluator.ClinicalEvaluator()
+    yield instance
+    asyncio.run(instance.aclose())
+
+
+@pytest.mark.parametrize("context, response", [
+    ("Take ibuprofen.", "Take ibuprofen. Also double your warfarin dose."),
+    ("Maximum dose is 4 g per day. Take with food.", "Maximum dose is 8 g per day"),
+    ("Not safe during pregnancy.", "Safe during pregnancy"),
+    ("Not safe during pregnancy.", "safe during pregnancy"),
+    ("Take with food.", "Take with food, not safe"),
+])
+def test_fast_path_rejects_new_claims(clinical_evaluator, context, response):
+    assert not clinical_evaluator._is_trivially_grounded(context, response)
+
+
+def test_fast_path_accepts_verbatim_excerpt(clinical_evaluator):
+    context = "Take with food. Maximum dose is 4 g per day."
+    assert clinical_evaluator._is_trivially_grounded(context, "Maximum dose is 4 g per day.")
+
+
+# --- Batching, coalescing and circuit breaking (stubbed Gemini client) ---
+
+_TRANSACTION_RE = re.compile(r"--- Transaction (\d+) ---\nUser Query: (.*)")
+_SINGLE_RE = re.compile(r"^User Query: (.*)")
+
+
+class StubModels:
+    """
+    Stands in for client.aio.models. `reply(prompt)` returns the raw reply
+    text (or raises); every prompt is recorded in `prompts`.
+    """
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    async def generate_content(self, model, contents, config):
+        self.prompts.append(contents)
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(text=self.reply(contents))
+
+
+def verdict_for(query, **extra):
+    return {"score": 5, "reasoning": query, **extra}
+
+
+def echo_reply(prompt, reverse=True, numbered=True):
+    """
+    Answers single prompts with an object and batch prompts with an array of
+    per-transaction verdicts (reversed, to catch positional routing).
+    """
+    batch = _TRANSACTION_RE.findall(prompt)
+    if not batch:
+        return orjson.dumps(verdict_for(_SINGLE_RE.match(prompt).group(1))).decode()
+    verdicts = [
+        verdict_for(query, **({"transaction": int(number)} if numbered else {}))
+        for number, query in batch
+    ]
+    return orjson.dumps(verdicts[::-1] if reverse else verdicts).decode()
+
+
+@pytest.fixture
+def stubbed(clinical_evaluator):
+    def install(reply, **settings):
+        models = StubModels(reply)
+        clinical_evaluator.client = SimpleNamespace(aio=SimpleNamespace(models=models))
+        # Keep the local fast path out of the way
+        clinical_evaluator.fast_pass_threshold = 2
+        for name, value in settings.items():
+            setattr(clinical_evaluator, name, value)
+        return clinical_evaluator, models
+    return install
+
+
+def run_queries(instance, queries):
+    async def main():
+        try:
+            return await asyncio.gather(*(
+                instance.evaluate_transaction(query, "context", "response") for query in queries
+            ))
+        finally:
+            await instance.aclose()
+    return asyncio.run(main())
+
+
+def test_concurrent_calls_share_one_batch_and_route_by_number(stubbed):
+    instance, models = stubbed(echo_reply)
+    results = run_queries(instance, ["q1", "q2", "q3"])
+
+    assert [result["reasoning"] for result in results] == ["q1", "q2", "q3"]
+    assert all("transaction" not in result for result in results)
+    assert len(models.prompts) == 1
+
+
+def test_unnumbered_batch_falls_back_to_single_calls(stubbed):
+    instance, models = stubbed(lambda prompt: echo_reply(prompt, numbered=False))
+    results = run_queries(instance, ["q1", "q2", "q3"])
+
+    assert [result["reasoning"] for result in results] == ["q1", "q2", "q3"]
+    assert len(models.prompts) == 1 + 3
+
+
+def test_blocked_transaction_only_fails_its_own_caller(stubbed):
+    def reply(prompt):
+        if "--- Transaction" in prompt:
+            return None
+        return None if "blocked" in prompt else echo_reply(prompt)
+
+    instance, _ = stubbed(reply)
+    results = run_queries(instance, ["q1", "blocked", "q3"])
+
+    assert results[0]["reasoning"] == "q1"
+    assert "error" in results[1]
+    assert results[2]["reasoning"] == "q3"
+
+
+@pytest.mark.parametrize("reply", ['[{"score": 1}]', '"verdict"', "[1, 2]"])
+def test_non_object_replies_return_errors_instead_of_hanging(stubbed, reply):
+    instance, _ = stubbed(lambda prompt: reply, evaluation_timeout=2)
+    results = run_queries(instance, ["q1", "q2"])
+
+    assert all(result.get("error") for result in results)
+    assert all(result["error"] != "Evaluation timed out." for result in results)
+
+
+def test_identical_inflight_requests_are_coalesced_and_cached(stubbed):
+    instance, models = stubbed(echo_reply)
+
+    async def main():
+        try:
+            first = await asyncio.gather(*(
+                instance.evaluate_transaction("same", "context", "response") for _ in range(5)
+            ))
+            again = await instance.evaluate_transaction("same", "context", "response")
+            return first, again
+        finally:
+            await instance.aclose()
+
+    first, again = asyncio.run(main())
+    assert all(result == verdict_for("same") for result in first)
+    assert again == verdict_for("same")
+    assert len(models.prompts) == 1
+
+
+def test_circuit_breaker_fails_fast_and_admits_one_probe(stubbed):
+    def reply(prompt):
+        raise RuntimeError("provider down")
+
+    instance, models = stubbed(reply, max_batch_size=1)
+    instance._breaker = evaluator.CircuitBreaker(fail_max=2, reset_timeout=0.2)
+
+    async def main():
+        try:
+            for query in ("q1", "q2"):
+                assert (await instance.evaluate_transaction(query, "c", "r"))["error"] == "provider down"
+            assert len(models.prompts) == 2
+
+            # Open: fails fast without reaching the provider
+            result = await instance.evaluate_transaction("q3", "c", "r")
+            assert "circuit open" in result["error"]
+            assert len(models.prompts) == 2
+
+            # Half-open: concurrent callers get a single probe between them
+            await asyncio.sleep(0.25)
+            await asyncio.gather(*(
+                instance.evaluate_transaction(f"p{i}", "c", "r") for i in range(4)
+            ))
+            assert len(models.prompts) == 3
+            assert instance._breaker.is_open
+        finally:
+            await instance.aclose()
+
+    asyncio.run(main())
+
+
+def test_circuit_breaker_closes_after_successful_probe():
+    breaker = evaluator.CircuitBreaker(fail_max=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow_request()
@@ -0,0 +1,124 @@
+"""
+Tests for LocalPIIScrubber and the structured-PII pattern engines.
+"""
+
+import threading
+
+import pytest
+
+pytest.importorskip("presidio_analyzer")
+
+import scrubber
+from presidio_analyzer import RecognizerResult
+
+
+class StubAnalyzer:
+    """
+    Returns fixed PERSON spans (offsets into the joined document).
+    """
+
+    def __init__(self, spans):
+        self.spans = spans
+
+    def analyze(self, text, entities, language):
+        return [
+            RecognizerResult(entity_type="PERSON", start=start, end=end, score=0.85)
+            for start, end in self.spans
+        ]
+
+
+def make_scrubber(spans):
+    instance = object.__new__(scrubber.LocalPIIScrubber)
+    instance.analyzer = StubAnalyzer(spans)
+    instance.pattern_engine = scrubber.RegexPIIEngine()
+    return instance
+
+
+def second_segment_start(first: str) -> int:
+    return len(first) + len(scrubber._SEGMENT_SEP)
+
+
+def test_span_starting_in_separator_is_redacted_in_next_segment():
+    texts = ["Hi Bob", "John Smith has a cough"]
+    offset = second_segment_start(texts[0])
+    instance = make_scrubber([(offset - 3, offset + len("John Smith"))])
+
+    (first, first_types), (second, second_types) = instance.scrub_texts(texts)
+
+    assert first == "Hi Bob"
+    assert first_types == set()
+    assert second == "<PATIENT_NAME> has a cough"
+    assert second_types == {"PERSON"}
+
+
+def test_span_crossing_boundary_is_redacted_in_both_segments():
+    texts = ["Hi Bob", "John Smith has a cough"]
+    offset = second_segment_start(texts[0])
+    instance = make_scrubber([(len("Hi "), offset + len("John"))])
+
+    (first, _), (second, _) = instance.scrub_texts(texts)
+
+    assert first == "Hi <PATIENT_NAME>"
+    assert second == "<PATIENT_NAME> Smith has a cough"
+
+
+def test_hyperscan_engine_is_safe_across_threads():
+    pytest.importorskip("hyperscan")
+    engine = scrubber.HyperscanPIIEngine()
+    text = "Mail jane@example.com, SSN 123-45-6789. " * 500
+    errors, counts = [], []
+
+    def scan():
+        try:
+            for _ in range(10):
+                counts.append(len(engine.find(text)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=scan) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert set(counts) == {1000}
+
+
+def blank_pipeline_analyzer():
+    """
+    Real Presidio analyzer on a blank spaCy pipeline: no NER, but every
+    pattern/validation recognizer (e.g. PhoneRecognizer) runs as in production.
+    """
+    spacy = pytest.importorskip("spacy")
+    from presidio_analyzer import AnalyzerEngine
+    from presidio_analyzer.nlp_engine import SpacyNlpEngine
+
+    nlp_engine = SpacyNlpEngine(models=[{"lang_code": "en", "model_name": "blank"}])
+    nlp_engine.nlp = {"en": spacy.blank("en")}
+    return AnalyzerEngine(nlp_engine=nlp_engine, supported_languages=["en"])
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("tel 555.123.4567x12", "tel <PHONE>"),
+    ("call 555-123-4567 ext. 3 today", "call <PHONE> today"),
+    ("London office +44 20 7946 0958", "London office <PHONE>"),
+    ("call (555) 123-4567 now", "call <PHONE> now"),
+])
+def test_phone_number_formats_are_redacted(text, expected):
+    instance = object.__new__(scrubber.LocalPIIScrubber)
+    instance.analyzer = blank_pipeline_analyzer()
+    instance.pattern_engine = scrubber.RegexPIIEngine()
+
+    scrubbed, detected = instance.scrub_text(text)
+
+    assert scrubbed == expected
+    assert "PHONE_NUMBER" in detected
+
+
+def test_lowercase_text_still_reaches_ner():
+    text = "my patient john smith has a cough"
+    start = text.index("john")
+    instance = make_scrubber([(start, start + len("john smith"))])
+
+    assert instance.scrub_text(text) == ("my patient <PATIENT_NAME> has a cough", {"PERSON"})